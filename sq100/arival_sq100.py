@@ -19,10 +19,12 @@
 import collections
 import datetime
 import functools
+import itertools
 import logging
+import operator
 import struct
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
 from sq100 import gpx
 from sq100.exceptions import SQ100MessageException
@@ -30,9 +32,104 @@ from sq100.serial_connection import SerialConfig, SerialConnection
 
 logger = logging.getLogger(__name__)
 
+_LAP_HEAD = struct.Struct(">6B3IH8sB")
+_LAP_ENTRY = struct.Struct(">3I3H2B2H13s2H")
+_TRACK_HEAD = struct.Struct(">6B3I5HB")
+_TRACK_INFO = struct.Struct(">6B3I5HB3H2B4H13s")
+_TP_HEAD = struct.Struct(">6B3IH2IB")
+_TP_ENTRY = struct.Struct(">2i3HBHH6s")
+_MSG_HEAD = struct.Struct(">BH")
+_TRACK_HEAD_PREFIX = struct.Struct(">6B3IH")
+
+_LapInfoHeader = collections.namedtuple(
+    "_LapInfoHeader",
+    [
+        "year",
+        "month",
+        "day",
+        "hour",
+        "minute",
+        "second",
+        "no_points",
+        "duration",
+        "distance",
+        "no_laps",
+        "NA_1",
+        "msg_type",
+    ],
+)
+
+_TrackInfoRecord = collections.namedtuple(
+    "_TrackInfoRecord",
+    [
+        "year",
+        "month",
+        "day",
+        "hour",
+        "minute",
+        "second",
+        "no_points",
+        "duration",
+        "distance",
+        "no_laps",
+        "NA_1",
+        "memory_block_index",
+        "NA_2",
+        "id",
+        "msg_type",
+        "calories",
+        "NA_3",
+        "max_speed",
+        "max_heart_rate",
+        "avg_heart_rate",
+        "asc_height",
+        "des_height",
+        "min_height",
+        "max_height",
+        "NA_4",
+    ],
+)
+
+_TrackPointHeader = collections.namedtuple(
+    "_TrackPointHeader",
+    [
+        "year",
+        "month",
+        "day",
+        "hour",
+        "minute",
+        "second",
+        "no_points",
+        "duration",
+        "distance",
+        "no_laps",
+        "first_session_index",
+        "last_session_index",
+        "msg_type",
+    ],
+)
+
 
 @dataclass
 class TrackInfo:
+    __slots__ = (
+        "date",
+        "distance",
+        "duration",
+        "no_laps",
+        "no_track_points",
+        "ascending_height",
+        "avg_heart_rate",
+        "calories",
+        "descending_height",
+        "id",
+        "max_heart_rate",
+        "max_height",
+        "max_speed",
+        "memory_block_index",
+        "min_height",
+    )
+
     date: datetime.datetime
     distance: float
     duration: datetime.timedelta
@@ -52,6 +149,20 @@ class TrackInfo:
 
 @dataclass
 class Lap:
+    __slots__ = (
+        "duration",
+        "total_time",
+        "distance",
+        "calories",
+        "max_speed",
+        "max_heart_rate",
+        "avg_heart_rate",
+        "min_height",
+        "max_height",
+        "first_index",
+        "last_index",
+    )
+
     duration: datetime.timedelta
     total_time: datetime.timedelta
     distance: float
@@ -67,6 +178,8 @@ class Lap:
 
 @dataclass
 class TrackPoint:
+    __slots__ = ("latitude", "longitude", "altitude", "interval", "speed", "heart_rate")
+
     latitude: float
     longitude: float
     altitude: float
@@ -77,6 +190,8 @@ class TrackPoint:
 
 @dataclass
 class Track:
+    __slots__ = ("info", "laps", "track_points")
+
     info: TrackInfo
     laps: List[Lap]
     track_points: List[TrackPoint]
@@ -84,13 +199,15 @@ class Track:
 
 @dataclass
 class Message:
+    __slots__ = ("command", "payload_length", "parameter", "checksum")
+
     command: int
     payload_length: int
     parameter: bytes
     checksum: int
 
 
-@dataclass
+@dataclass(frozen=True)
 class TrackHead:
     date: datetime.datetime
     duration: datetime.timedelta
@@ -101,6 +218,16 @@ class TrackHead:
 
 @dataclass
 class TrackListEntry:
+    __slots__ = (
+        "date",
+        "no_laps",
+        "duration",
+        "distance",
+        "no_track_points",
+        "memory_block_index",
+        "id",
+    )
+
     date: datetime.datetime
     no_laps: int
     duration: datetime.timedelta
@@ -121,9 +248,15 @@ def head_is_compatible_to_track(head: TrackHead, track_info: TrackInfo) -> bool:
 
 
 def calc_checksum(payload: bytes) -> int:
-    payload_len = struct.pack("H", len(payload))
-    checksum = functools.reduce(lambda x, y: x ^ y, payload_len + payload)
-    return checksum
+    payload_len = len(payload)
+    # xor all bytes at once: read the payload as one integer and fold its
+    # upper half onto its lower half until a single byte is left
+    checksum = int.from_bytes(payload, "little")
+    width = 8 << (payload_len - 1).bit_length()
+    while width > 8:
+        width //= 2
+        checksum = (checksum ^ (checksum >> width)) & ((1 << width) - 1)
+    return checksum ^ (payload_len & 0xFF) ^ (payload_len >> 8)
 
 
 def create_message(command: int, parameter: bytes = b"") -> bytes:
@@ -131,9 +264,7 @@ def create_message(command: int, parameter: bytes = b"") -> bytes:
     payload = bytes([command]) + parameter
     payload_length = len(payload)
     checksum = calc_checksum(payload)
-    return struct.pack(
-        ">BH%dsB" % len(payload), start_sequence, payload_length, payload, checksum
-    )
+    return _MSG_HEAD.pack(start_sequence, payload_length) + payload + bytes([checksum])
 
 
 def is_get_tracks_finish_message(msg: Message) -> bool:
@@ -192,129 +323,97 @@ def process_get_tracks_track_points_msg(
     return track_points
 
 
-def unpack_lap_info_parameter(parameter: bytes) -> Tuple[TrackHead, List[Lap]]:
-    TrackHeader = collections.namedtuple(
-        "TrackHeader",
-        [
-            "year",
-            "month",
-            "day",
-            "hour",
-            "minute",
-            "second",
-            "no_points",
-            "duration",
-            "distance",
-            "no_laps",
-            "NA_1",
-            "msg_type",
-        ],
+@functools.lru_cache(maxsize=256)
+def _interval(tenths: int) -> datetime.timedelta:
+    """track point intervals take few distinct values, share their timedeltas"""
+    return datetime.timedelta(microseconds=tenths * 100000)
+
+
+@functools.lru_cache(maxsize=8)
+def _unpack_track_head(head: bytes) -> TrackHead:
+    """decode the track head, which repeats in every message of a track"""
+    (
+        year,
+        month,
+        day,
+        hour,
+        minute,
+        second,
+        no_points,
+        duration,
+        distance,
+        no_laps,
+    ) = _TRACK_HEAD_PREFIX.unpack(head)
+    return TrackHead(
+        date=datetime.datetime(2000 + year, month, day, hour, minute, second),
+        no_track_points=no_points,
+        duration=datetime.timedelta(microseconds=duration * 100000),
+        distance=distance,
+        no_laps=no_laps,
     )
-    t = TrackHeader(*struct.unpack(">6B3IH8sB", parameter[:29]))
+
+
+def unpack_lap_info_parameter(parameter: bytes) -> Tuple[TrackHead, List[Lap]]:
+    t = _LapInfoHeader(*_LAP_HEAD.unpack_from(parameter))
     if t.msg_type != 0xAA:
         raise SQ100MessageException("wrong get_tracks message type")
-    track = TrackHead(
-        date=datetime.datetime(
-            2000 + t.year, t.month, t.day, t.hour, t.minute, t.second
-        ),
-        no_track_points=t.no_points,
-        duration=datetime.timedelta(seconds=round(t.duration / 10, 1)),
-        distance=t.distance,
-        no_laps=t.no_laps,
-    )
-    LapInfo = collections.namedtuple(
-        "LapInfo",
-        [
-            "duration",
-            "total_time",
-            "distance",
-            "calories",
-            "NA_1",
-            "max_speed",
-            "max_heart_rate",
-            "avg_heart_rate",
-            "min_height",
-            "max_height",
-            "NA_2",
-            "first_index",
-            "last_index",
-        ],
-    )
-    lap_infos = map(LapInfo._make, struct.iter_unpack(">3I3H2B2H13s2H", parameter[29:]))
+    track = _unpack_track_head(bytes(parameter[: _TRACK_HEAD_PREFIX.size]))
     laps = [
         Lap(
-            duration=datetime.timedelta(seconds=round(lap.duration / 10, 1)),
-            total_time=datetime.timedelta(seconds=round(lap.total_time / 10, 1)),
-            distance=lap.distance,
-            calories=lap.calories,
-            max_speed=lap.max_speed,
-            max_heart_rate=lap.max_heart_rate,
-            avg_heart_rate=lap.avg_heart_rate,
-            min_height=lap.min_height,
-            max_height=lap.max_height,
-            first_index=lap.first_index,
-            last_index=lap.last_index,
+            duration=datetime.timedelta(microseconds=duration * 100000),
+            total_time=datetime.timedelta(microseconds=total_time * 100000),
+            distance=distance,
+            calories=calories,
+            max_speed=max_speed,
+            max_heart_rate=max_heart_rate,
+            avg_heart_rate=avg_heart_rate,
+            min_height=min_height,
+            max_height=max_height,
+            first_index=first_index,
+            last_index=last_index,
         )
-        for lap in lap_infos
+        for (
+            duration,
+            total_time,
+            distance,
+            calories,
+            _,
+            max_speed,
+            max_heart_rate,
+            avg_heart_rate,
+            min_height,
+            max_height,
+            _,
+            first_index,
+            last_index,
+        ) in _LAP_ENTRY.iter_unpack(memoryview(parameter)[_LAP_HEAD.size :])
     ]
     return track, laps
 
 
 def unpack_track_info_parameter(parameter: bytes) -> TrackInfo:
-    TrackHeader = collections.namedtuple(
-        "TrackHeader",
-        [
-            "year",
-            "month",
-            "day",
-            "hour",
-            "minute",
-            "second",
-            "no_points",
-            "duration",
-            "distance",
-            "no_laps",
-            "NA_1",
-            "memory_block_index",
-            "NA_2",
-            "id",
-            "msg_type",
-        ],
-    )
-    header = TrackHeader._make(struct.unpack(">6B3I5HB", parameter[:29]))
-    if header.msg_type != 0x00:
+    # replies of the other get_tracks message types can be shorter
+    if len(parameter) < _TRACK_INFO.size:
+        raise SQ100MessageException("wrong get_tracks message type")
+    # the track head and the track data follow each other, decode them at once
+    info = _TrackInfoRecord._make(_TRACK_INFO.unpack_from(parameter))
+    if info.msg_type != 0x00:
         raise SQ100MessageException("wrong get_tracks message type")
-    TrackData = collections.namedtuple(
-        "TrackInfo",
-        [
-            "calories",
-            "NA_1",
-            "max_speed",
-            "max_heart_rate",
-            "avg_heart_rate",
-            "asc_height",
-            "des_height",
-            "min_height",
-            "max_height",
-            "NA_2",
-        ],
-    )
-    info = TrackData._make(struct.unpack(">3H2B4H13s", parameter[29:]))
     track = TrackInfo(
         date=datetime.datetime(
-            2000 + header.year,
-            header.month,
-            header.day,
-            header.hour,
-            header.minute,
-            header.second,
+            2000 + info.year,
+            info.month,
+            info.day,
+            info.hour,
+            info.minute,
+            info.second,
         ),
-        no_track_points=header.no_points,
-        duration=datetime.timedelta(seconds=round(header.duration / 10, 1)),
-        distance=header.distance,
-        no_laps=header.no_laps,
-        memory_block_index=header.memory_block_index,
-        id=header.id,
+        no_track_points=info.no_points,
+        duration=datetime.timedelta(microseconds=info.duration * 100000),
+        distance=info.distance,
+        no_laps=info.no_laps,
+        memory_block_index=info.memory_block_index,
+        id=info.id,
         calories=info.calories,
         max_speed=info.max_speed,
         max_heart_rate=info.max_heart_rate,
@@ -330,116 +429,82 @@ def unpack_track_info_parameter(parameter: bytes) -> TrackInfo:
 def unpack_track_point_parameter(
     parameter: bytes,
 ) -> Tuple[TrackHead, Tuple[int, int], List[TrackPoint]]:
-    TrackHeader = collections.namedtuple(
-        "TrackHeader",
-        [
-            "year",
-            "month",
-            "day",
-            "hour",
-            "minute",
-            "second",
-            "no_points",
-            "duration",
-            "distance",
-            "no_laps",
-            "first_session_index",
-            "last_session_index",
-            "msg_type",
-        ],
-    )
-    t = TrackHeader._make(struct.unpack(">6B3IH2IB", parameter[:29]))
+    t = _TrackPointHeader._make(_TP_HEAD.unpack_from(parameter))
     if t.msg_type != 0x55:
         raise SQ100MessageException("wrong get_tracks message type")
-    track = TrackHead(
-        date=datetime.datetime(
-            2000 + t.year, t.month, t.day, t.hour, t.minute, t.second
-        ),
-        no_track_points=t.no_points,
-        duration=datetime.timedelta(seconds=round(t.duration / 10, 1)),
-        distance=t.distance,
-        no_laps=t.no_laps,
-    )
+    track = _unpack_track_head(bytes(parameter[: _TRACK_HEAD_PREFIX.size]))
     session_indices = (t.first_session_index, t.last_session_index)
-    TrackPointData = collections.namedtuple(
-        "TrackPointData",
-        [
-            "latitude",
-            "longitude",
-            "altitude",
-            "NA_1",
-            "speed",
-            "heart_rate",
-            "NA_2",
-            "interval_time",
-            "NA_3",
-        ],
-    )
-    trackpoint_data = map(
-        TrackPointData._make, struct.iter_unpack(">2i3HBHH6s", parameter[29:])
-    )
     trackpoints = [
         TrackPoint(
-            latitude=round(t.latitude * 1e-6, 6),
-            longitude=round(t.longitude * 1e-6, 6),
-            altitude=t.altitude,
-            speed=round(t.speed * 1e-2, 2),
-            heart_rate=t.heart_rate,
-            interval=datetime.timedelta(seconds=round(t.interval_time * 1e-1, 1)),
+            latitude=latitude / 1e6,
+            longitude=longitude / 1e6,
+            altitude=altitude,
+            speed=speed / 100,
+            heart_rate=heart_rate,
+            interval=_interval(interval_time),
         )
-        for t in trackpoint_data
+        for (
+            latitude,
+            longitude,
+            altitude,
+            _,
+            speed,
+            heart_rate,
+            _,
+            interval_time,
+            _,
+        ) in _TP_ENTRY.iter_unpack(memoryview(parameter)[_TP_HEAD.size :])
     ]
     return track, session_indices, trackpoints
 
 
 def unpack_track_list_parameter(parameter: bytes) -> List[TrackListEntry]:
-    TrackHeader = collections.namedtuple(
-        "TrackHeader",
-        [
-            "year",
-            "month",
-            "day",
-            "hour",
-            "minute",
-            "second",
-            "no_points",
-            "duration",
-            "distance",
-            "lap_count",
-            "unused_1",
-            "memory_block_index",
-            "unused_2",
-            "id",
-            "unused_3",
-        ],
-    )
-    track_headers = map(TrackHeader._make, struct.iter_unpack(">6B3I5HB", parameter))
     tracks = [
         TrackListEntry(
-            date=datetime.datetime(
-                2000 + t.year, t.month, t.day, t.hour, t.minute, t.second
-            ),
-            no_laps=t.lap_count,
-            duration=datetime.timedelta(seconds=round(t.duration / 10, 1)),
-            distance=t.distance,
-            no_track_points=t.no_points,
-            memory_block_index=t.memory_block_index,
-            id=t.id,
+            date=datetime.datetime(2000 + year, month, day, hour, minute, second),
+            no_laps=lap_count,
+            duration=datetime.timedelta(microseconds=duration * 100000),
+            distance=distance,
+            no_track_points=no_points,
+            memory_block_index=memory_block_index,
+            id=track_id,
         )
-        for t in track_headers
+        for (
+            year,
+            month,
+            day,
+            hour,
+            minute,
+            second,
+            no_points,
+            duration,
+            distance,
+            lap_count,
+            _,
+            memory_block_index,
+            _,
+            track_id,
+            _,
+        ) in _TRACK_HEAD.iter_unpack(parameter)
     ]
     return tracks
 
 
-def unpack_message(message: bytes) -> Message:
-    msg = Message(*struct.unpack(">BH%dsB" % (len(message) - 4), message))
+def unpack_message(message: bytes, verify: bool = True) -> Message:
+    command, payload_length = _MSG_HEAD.unpack_from(message)
+    msg = Message(
+        command=command,
+        payload_length=payload_length,
+        parameter=message[_MSG_HEAD.size : -1],
+        checksum=message[-1],
+    )
     if msg.payload_length != len(msg.parameter):
         raise SQ100MessageException(
             "paylod has wrong length!\n"
             + ("Message says %d\n" % msg.payload_length)
             + ("Parameter length is %d" % len(msg.parameter))
         )
-    if msg.checksum != calc_checksum(msg.parameter):
+    if verify and msg.checksum != calc_checksum(msg.parameter):
         raise SQ100MessageException("checksum wrong")
     return msg
 
@@ -449,37 +514,53 @@ def get_tracks(config: SerialConfig, track_ids: List[int]) -> List[Track]:
         return query_tracks(connection, track_ids)
 
 
+def iter_tracks(config: SerialConfig, track_ids: List[int]) -> Iterator[Track]:
+    with SerialConnection(config) as connection:
+        yield from iter_query_tracks(connection, track_ids)
+
+
 def query_tracks(connection: SerialConnection, track_ids: List[int]) -> List[Track]:
+    return list(iter_query_tracks(connection, track_ids))
+
+
+def iter_query_tracks(
+    connection: SerialConnection, track_ids: List[int]
+) -> Iterator[Track]:
+    """yield each track as soon as it is completely downloaded"""
     track_list = query_track_list(connection)
     memory_indices = track_ids_to_memory_indices(tracks=track_list, track_ids=track_ids)
     params = pack_get_tracks_parameter(memory_indices)
     msg = query(connection, command=0x80, parameter=params)
-    tracks = []
     for _ in range(len(track_ids)):
         track_info = process_get_tracks_track_info_msg(msg)
         laps = process_get_tracks_lap_info_msg(
             expected_track_info=track_info, msg=query(connection, command=0x81)
         )
         track_points: List[TrackPoint] = []
-        while len(track_points) < track_info.no_track_points:
-            track_points += process_get_tracks_track_points_msg(
+        no_received = 0
+        while no_received < track_info.no_track_points:
+            session = process_get_tracks_track_points_msg(
                 expected_track_info=track_info,
-                expected_session_start=len(track_points),
+                expected_session_start=no_received,
                 msg=query(connection, 0x81),
             )
-        tracks.append(Track(info=track_info, laps=laps, track_points=track_points))
+            track_points.extend(session)
+            no_received += len(session)
+        yield Track(info=track_info, laps=laps, track_points=track_points)
         msg = query(connection, 0x81)
     if not is_get_tracks_finish_message(msg):
         raise SQ100MessageException("expected end of transmission message")
-    logger.info("number of downloaded tracks: %d", len(tracks))
-    return tracks
+    logger.info("number of downloaded tracks: %d", len(track_ids))
 
 
 def track_ids_to_memory_indices(
     tracks: List[TrackListEntry], track_ids: List[int]
 ) -> List[int]:
     index = {t.id: t.memory_block_index for t in tracks}
-    memory_indices = [index[track_id] for track_id in track_ids]
+    try:
+        memory_indices = [index[track_id] for track_id in track_ids]
+    except KeyError as e:
+        raise SQ100MessageException("no track with id %s on device" % e) from e
     return memory_indices
 
 
@@ -501,7 +582,7 @@ def query(
     connection.write(create_message(command, parameter))
     # first, read three bytes to determine payload
     begin = connection.read(3)
-    _, payload = struct.unpack(">BH", begin)
+    _, payload = _MSG_HEAD.unpack(begin)
     rest = connection.read(payload + 1)  # +1 for checksum
     return unpack_message(begin + rest)
 
@@ -524,17 +605,18 @@ def track_to_gpx(track: Track, number: int = 0) -> gpx.Track:
 def track_points_to_gpx(
     track_points: List[TrackPoint], start_time: datetime.datetime
 ) -> List[gpx.TrackPoint]:
-    gpx_points: List[gpx.TrackPoint] = []
-    time = start_time
-    for point in track_points:
-        time += point.interval
-        gpx_points.append(
-            gpx.TrackPoint(
-                latitude=point.latitude,
-                longitude=point.longitude,
-                elevation=point.altitude,
-                time=time,
-                heart_rate=point.heart_rate,
-            )
+    times = itertools.accumulate(
+        (point.interval for point in track_points), operator.add, initial=start_time
+    )
+    # the first point is already one interval past the start time
+    next(times)
+    return [
+        gpx.TrackPoint(
+            latitude=point.latitude,
+            longitude=point.longitude,
+            elevation=point.altitude,
+            time=time,
+            heart_rate=point.heart_rate,
         )
-    return gpx_points
+        for point, time in zip(track_points, times)
+    ]
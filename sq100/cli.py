@@ -18,20 +18,22 @@
 
 
 import argparse
+import concurrent.futures
 import configparser
+import functools
+import itertools
 import logging
+import operator
 import os
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Set, Union
+from typing import List, Optional, Tuple, Union
 
 import tabulate
 
 from sq100 import arival_sq100, gpx, serial_connection
 
-logging.basicConfig(filename="sq100.log", level=logging.DEBUG)
-
 
 @dataclass
 class ListOptions:
@@ -50,6 +52,9 @@ Options = Union[ListOptions, DownloadOptions]
 
 
 def main() -> None:
+    logging.basicConfig(
+        handlers=[logging.FileHandler("sq100.log", delay=True)], level=logging.DEBUG
+    )
     default_serial_config = load_default_serial_config()
     options = parse_args(args=sys.argv, default_serial_config=default_serial_config)
     if isinstance(options, ListOptions):
@@ -76,6 +81,31 @@ def load_default_serial_config() -> serial_connection.SerialConfig:
 def parse_args(
     args: List[str], default_serial_config: serial_connection.SerialConfig
 ) -> Options:
+    parser = _build_parser(default_serial_config)
+    opts = parser.parse_args(args=args)
+
+    if opts.command == "list":
+        return ListOptions(
+            serial_config=serial_connection.SerialConfig(
+                port=opts.comport, baudrate=opts.baudrate, timeout=opts.timeout
+            ),
+        )
+    else:
+        assert opts.command == "download"
+        return DownloadOptions(
+            serial_config=serial_connection.SerialConfig(
+                port=opts.comport, baudrate=opts.baudrate, timeout=opts.timeout
+            ),
+            track_id=opts.track_ids or [],
+            merge=opts.merge,
+            latest=opts.latest,
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def _build_parser(
+    default_serial_config: serial_connection.SerialConfig,
+) -> argparse.ArgumentParser:
     serial_config_parser = argparse.ArgumentParser(
         add_help=False, formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
@@ -121,7 +151,7 @@ def parse_args(
         help="list of track ids to download",
         type=parse_range,
         nargs="?",
-        default=[],
+        default=None,
     )
     parser_download.add_argument(
         "-m", "--merge", help="merge into single file?", action="store_true"
@@ -130,49 +160,40 @@ def parse_args(
         "-l", "--latest", help="download latest track", action="store_true"
     )
 
-    opts = parser.parse_args(args=args)
-
-    if opts.command == "list":
-        return ListOptions(
-            serial_config=serial_connection.SerialConfig(
-                port=opts.comport, baudrate=opts.baudrate, timeout=opts.timeout
-            ),
-        )
-    else:
-        assert opts.command == "download"
-        return DownloadOptions(
-            serial_config=serial_connection.SerialConfig(
-                port=opts.comport, baudrate=opts.baudrate, timeout=opts.timeout
-            ),
-            track_id=opts.track_ids,
-            merge=opts.merge,
-            latest=opts.latest,
-        )
+    return parser
 
 
 def parse_range(astr: str) -> List[int]:
-    result: Set[int] = set()
+    intervals: List[Tuple[int, int]] = []
     for part in astr.split(","):
         x = part.split("-")
-        result.update(range(int(x[0]), int(x[-1]) + 1))
-    return sorted(result)
+        intervals.append((int(x[0]), int(x[-1])))
+    merged: List[Tuple[int, int]] = []
+    for first, last in sorted(intervals):
+        if first > last:
+            continue
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return list(
+        itertools.chain.from_iterable(range(first, last + 1) for first, last in merged)
+    )
 
 
 def show_tracklist(serial_config: serial_connection.SerialConfig) -> None:
     tracks = arival_sq100.get_track_list(serial_config)
     if tracks:
-        table = [
-            [
-                track.id,
-                track.date,
-                track.distance,
-                track.duration,
-                track.no_track_points,
-                track.no_laps,
-                track.memory_block_index,
-            ]
-            for track in tracks
-        ]
+        row = operator.attrgetter(
+            "id",
+            "date",
+            "distance",
+            "duration",
+            "no_track_points",
+            "no_laps",
+            "memory_block_index",
+        )
+        table = list(map(row, tracks))
         headers = [
             "id",
             "date",
@@ -182,36 +203,51 @@ def show_tracklist(serial_config: serial_connection.SerialConfig) -> None:
             "laps",
             "mem. index",
         ]
-        print(tabulate.tabulate(table, headers=headers))
+        # date and duration columns are never numeric, skip number parsing there
+        print(tabulate.tabulate(table, headers=headers, disable_numparse=[1, 3]))
     else:
         print("no tracks found")
 
 
 def download_tracks(
     serial_config: serial_connection.SerialConfig,
-    track_ids: List[int] = [],
+    track_ids: Optional[List[int]] = None,
     merge: bool = False,
     latest: bool = False,
-    output_dir: Path = Path.cwd(),
+    output_dir: Optional[Path] = None,
 ) -> None:
+    track_ids = list(track_ids or [])
+    output_dir = output_dir or Path.cwd()
     if latest:
         latest_track_id = get_latest_track_id(serial_config=serial_config)
         if latest_track_id is not None:
             track_ids.append(latest_track_id)
     if len(track_ids) == 0:
         return
-    tracks = arival_sq100.get_tracks(config=serial_config, track_ids=track_ids)
     if merge:
+        tracks = arival_sq100.get_tracks(config=serial_config, track_ids=track_ids)
         gpx.store_tracks_to_file(
             tracks=arival_sq100.tracks_to_gpx(tracks),
             filename=str(output_dir / "downloaded_tracks.gpx"),
         )
     else:
-        for track in tracks:
-            gpx.store_tracks_to_file(
-                tracks=[arival_sq100.track_to_gpx(track)],
-                filename=str(output_dir / f"downloaded_tracks-{track.info.id}.gpx"),
-            )
+        # write each track while the next one is still being downloaded
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            futures = [
+                executor.submit(store_track_to_file, track, output_dir)
+                for track in arival_sq100.iter_tracks(
+                    config=serial_config, track_ids=track_ids
+                )
+            ]
+        for future in futures:
+            future.result()
+
+
+def store_track_to_file(track: arival_sq100.Track, output_dir: Path) -> None:
+    gpx.store_tracks_to_file(
+        tracks=[arival_sq100.track_to_gpx(track)],
+        filename=str(output_dir / f"downloaded_tracks-{track.info.id}.gpx"),
+    )
 
 
 def get_latest_track_id(serial_config: serial_connection.SerialConfig) -> Optional[int]:
@@ -219,5 +255,6 @@ def get_latest_track_id(serial_config: serial_connection.SerialConfig) -> Option
     if len(track_headers) == 0:
         print("no tracks found")
         return None
-    latest = sorted(track_headers, key=lambda t: t.date)[-1]
+    # the last of several tracks with the same date wins, as with sorting
+    latest = max(reversed(track_headers), key=operator.attrgetter("date"))
     return latest.id
@@ -17,6 +17,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import functools
+import itertools
 import xml.etree.ElementTree as etree
 from dataclasses import dataclass
 from typing import List, Optional
@@ -28,16 +30,21 @@ xsi_ns = "http://www.w3.org/2001/XMLSchema-instance"
 tpex_ns = "http://www.garmin.com/xmlschemas/TrackPointExtension/v2"
 tpex_ns_def = "https://www8.garmin.com/xmlschemas/TrackPointExtensionv2.xsd"
 
+_SCHEMA_LOCATION_KEY = str(etree.QName(xsi_ns, "schemaLocation"))
+_SCHEMA_LOCATION = f"{gpx_ns} {gpx_ns_def} {tpex_ns} {tpex_ns_def}"
+
 
 @dataclass
 class Bounds:
+    __slots__ = ("minlat", "minlon", "maxlat", "maxlon")
+
     minlat: float
     minlon: float
     maxlat: float
     maxlon: float
 
     def to_etree(self, ns: str = gpx_ns, tag: str = "bounds") -> etree.Element:
-        elem = etree.Element(str(etree.QName(ns, tag)))
+        elem = etree.Element(_qname(ns, tag))
         elem.set("minlat", str(self.minlat))
         elem.set("minlon", str(self.minlon))
         elem.set("maxlat", str(self.maxlat))
@@ -53,7 +60,7 @@ class Metadata:
     bounds: Optional[Bounds]
 
     def to_etree(self) -> etree.Element:
-        elem = etree.Element(str(etree.QName(gpx_ns, "metadata")))
+        elem = etree.Element(_qname(gpx_ns, "metadata"))
         elem.append(make_string_element(ns=gpx_ns, tag="name", value=self.name))
         elem.append(make_string_element(ns=gpx_ns, tag="desc", value=self.description))
         elem.append(make_datetime_element(ns=gpx_ns, tag="time", value=self.time))
@@ -64,6 +71,8 @@ class Metadata:
 
 @dataclass
 class TrackPoint:
+    __slots__ = ("latitude", "longitude", "elevation", "time", "heart_rate")
+
     latitude: float
     longitude: float
     elevation: float
@@ -71,7 +80,7 @@ class TrackPoint:
     heart_rate: float
 
     def to_etree(self) -> etree.Element:
-        elem = etree.Element(str(etree.QName(gpx_ns, "trkpt")))
+        elem = etree.Element(_qname(gpx_ns, "trkpt"))
         elem.set("lat", str(self.latitude))
         elem.set("lon", str(self.longitude))
         elem.append(make_decimal_element(gpx_ns, "ele", self.elevation))
@@ -82,13 +91,15 @@ class TrackPoint:
 
 @dataclass
 class Track:
+    __slots__ = ("comment", "src", "number", "track_points")
+
     comment: str
     src: str
     number: int
     track_points: List[TrackPoint]
 
     def to_etree(self) -> etree.Element:
-        elem = etree.Element(str(etree.QName(gpx_ns, "trk")))
+        elem = etree.Element(_qname(gpx_ns, "trk"))
         elem.append(make_string_element(ns=gpx_ns, tag="cmt", value=self.comment))
         elem.append(make_string_element(ns=gpx_ns, tag="src", value=self.src))
         elem.append(make_decimal_element(ns=gpx_ns, tag="number", value=self.number))
@@ -105,10 +116,7 @@ class GpxRoot:
         elem = etree.Element("gpx")
         elem.set("version", "1.1")
         elem.set("creator", "https://github.com/tnachstedt/sq100")
-        elem.set(
-            str(etree.QName(xsi_ns, "schemaLocation")),
-            f"{gpx_ns} {gpx_ns_def} {tpex_ns} {tpex_ns_def}",
-        )
+        elem.set(_SCHEMA_LOCATION_KEY, _SCHEMA_LOCATION)
         elem.append(self.metadata.to_etree())
         for track in self.tracks:
             elem.append(track.to_etree())
@@ -120,7 +128,7 @@ def store_tracks_to_file(tracks: List[Track], filename: str) -> None:
         metadata=Metadata(
             name="SQ100 Tracks",
             description="Tracks export from the SQ100 application",
-            time=datetime.datetime.now(),
+            time=datetime.datetime.now(datetime.timezone.utc),
             bounds=calc_tracks_bounds(tracks),
         ),
         tracks=tracks,
@@ -134,41 +142,59 @@ def store_tracks_to_file(tracks: List[Track], filename: str) -> None:
 
 
 def calc_tracks_bounds(tracks: List[Track]) -> Optional[Bounds]:
-    track_points: List[TrackPoint] = sum((track.track_points for track in tracks), [])
-    if len(track_points) == 0:
+    track_points = itertools.chain.from_iterable(track.track_points for track in tracks)
+    first = next(track_points, None)
+    if first is None:
         return None
-    return Bounds(
-        minlat=min([p.latitude for p in track_points]),
-        maxlat=max([p.latitude for p in track_points]),
-        minlon=min([p.longitude for p in track_points]),
-        maxlon=max([p.longitude for p in track_points]),
-    )
+    minlat = maxlat = first.latitude
+    minlon = maxlon = first.longitude
+    for track_point in track_points:
+        latitude = track_point.latitude
+        longitude = track_point.longitude
+        if latitude < minlat:
+            minlat = latitude
+        elif latitude > maxlat:
+            maxlat = latitude
+        if longitude < minlon:
+            minlon = longitude
+        elif longitude > maxlon:
+            maxlon = longitude
+    return Bounds(minlat=minlat, minlon=minlon, maxlat=maxlat, maxlon=maxlon)
 
 
 def _indent(elem: etree.Element, level: int = 0) -> None:
     """
-    copy and paste from http://effbot.org/zone/element-lib.htm#prettyprint
+    iterative version of http://effbot.org/zone/element-lib.htm#prettyprint
     """
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for elem in elem:
-            _indent(elem, level + 1)
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+    if (len(elem) or level) and (not elem.tail or not elem.tail.strip()):
+        elem.tail = _indentation(level)
+    stack = [(elem, level)] if len(elem) else []
+    while stack:
+        parent, depth = stack.pop()
+        if not parent.text or not parent.text.strip():
+            parent.text = _indentation(depth + 1)
+        for child in parent:
+            if not child.tail or not child.tail.strip():
+                child.tail = _indentation(depth + 1)
+            if len(child):
+                stack.append((child, depth + 1))
+        last = parent[-1]
+        if last.tail == _indentation(depth + 1):
+            last.tail = _indentation(depth)
+
+
+@functools.lru_cache(maxsize=None)
+def _indentation(level: int) -> str:
+    return "\n" + level * "  "
 
 
 def make_datetime_element(ns: str, tag: str, value: datetime.datetime) -> etree.Element:
-    utcoffset = value.utcoffset()
-    if utcoffset is not None:
-        value = (value - utcoffset).replace(tzinfo=None)
-    return make_string_element(ns, tag, "%sZ" % value.isoformat())
+    # track point times are naive, so only aware values need converting
+    if value.tzinfo is not None:
+        utcoffset = value.utcoffset()
+        if utcoffset is not None:
+            value = (value - utcoffset).replace(tzinfo=None)
+    return make_string_element(ns, tag, value.isoformat() + "Z")
 
 
 def make_decimal_element(ns: str, tag: str, value: float) -> etree.Element:
@@ -176,25 +202,30 @@ def make_decimal_element(ns: str, tag: str, value: float) -> etree.Element:
 
 
 def make_track_point_extensions_element(heart_rate: float) -> etree.Element:
-    extensions = etree.Element(str(etree.QName(gpx_ns, "extensions")))
+    extensions = etree.Element(_qname(gpx_ns, "extensions"))
     extensions.append(make_garmin_track_point_extension_element(heart_rate=heart_rate))
     return extensions
 
 
 def make_garmin_track_point_extension_element(heart_rate: float) -> etree.Element:
-    trkptex = etree.Element(str(etree.QName(tpex_ns, "TrackPointExtension")))
+    trkptex = etree.Element(_qname(tpex_ns, "TrackPointExtension"))
     trkptex.append(make_decimal_element(tpex_ns, "hr", heart_rate))
     return trkptex
 
 
 def make_track_segment_element(track_points: List[TrackPoint]) -> etree.Element:
-    segment = etree.Element(str(etree.QName(gpx_ns, "trkseg")))
+    segment = etree.Element(_qname(gpx_ns, "trkseg"))
     for track_point in track_points:
         segment.append(track_point.to_etree())
     return segment
 
 
 def make_string_element(ns: str, tag: str, value: str) -> etree.Element:
-    elem = etree.Element(str(etree.QName(ns, tag)))
+    elem = etree.Element(_qname(ns, tag))
     elem.text = value
     return elem
+
+
+@functools.lru_cache(maxsize=None)
+def _qname(ns: str, tag: str) -> str:
+    return str(etree.QName(ns, tag))
@@ -28,8 +28,11 @@ from sq100.exceptions import SQ100SerialException
 
 logger = logging.getLogger(__name__)
 
+# number of leading bytes of each transfer shown in the debug log
+_LOGGED_BYTES = 64
 
-@dataclass
+
+@dataclass(frozen=True)
 class SerialConfig:
     port: str
     baudrate: int
@@ -41,8 +44,10 @@ class SerialConnection:
 
     def __init__(self, config: SerialConfig):
         self.config = config
+        self._read_buffer = b""
 
     def __enter__(self) -> SerialConnection:
+        self._read_buffer = b""
         try:
             self.connection = serial.Serial(
                 baudrate=self.config.baudrate,
@@ -63,7 +68,8 @@ class SerialConnection:
 
     def write(self, command: bytes) -> None:
         assert self.connection is not None
-        logger.debug("writing data: %s", command)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("writing data: %s", command[:_LOGGED_BYTES].hex())
         try:
             self.connection.write(command)
         except serial.SerialTimeoutException:
@@ -71,7 +77,15 @@ class SerialConnection:
             raise SQ100SerialException
 
     def read(self, size: int) -> bytes:
+        """read size bytes, fetching everything already waiting in one go"""
         assert self.connection is not None
-        data = self.connection.read(size)
-        logger.debug("reading data:: %s", data)
-        return cast(bytes, data)
+        missing = size - len(self._read_buffer)
+        if missing > 0:
+            self._read_buffer += cast(
+                bytes, self.connection.read(max(missing, self.connection.in_waiting))
+            )
+        data = self._read_buffer[:size]
+        self._read_buffer = self._read_buffer[size:]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("reading data:: %s", data[:_LOGGED_BYTES].hex())
+        return data
@@ -54,7 +54,7 @@ def make_track_point(
 
 
 def make_track_info(
-    date: datetime.datetime = datetime.datetime.now(),
+    date: datetime.datetime = datetime.datetime(2000, 1, 1),
     distance: float = 0,
     duration: datetime.timedelta = datetime.timedelta(0),
     id: int = 0,
@@ -16,8 +16,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import copy
 import datetime
+import pickle
 import struct
+from typing import Callable, cast
 
 import pytest
 from pytest_mock import MockerFixture
@@ -43,12 +46,29 @@ def make_track_head(
     )
 
 
+@pytest.mark.parametrize(
+    "duplicate",
+    [copy.copy, copy.deepcopy, lambda head: pickle.loads(pickle.dumps(head))],
+)
+def test_track_head__can_be_duplicated(
+    duplicate: Callable[[arival_sq100.TrackHead], arival_sq100.TrackHead],
+) -> None:
+    head = make_track_head(no_laps=3, distance=1000, no_track_points=42)
+    assert duplicate(head) == head
+
+
 def test_calc_checksum__returns_corect_value_for_simple_payload() -> None:
     payload = b"\x45\x73\xAF\x20"
     checksum = 4 ^ 0x45 ^ 0x73 ^ 0xAF ^ 0x20
     assert checksum == arival_sq100.calc_checksum(payload)
 
 
+def test_calc_checksum__returns_correct_value_for_long_payload() -> None:
+    payload = bytes(range(256)) * 3 + b"\x45\x73\xAF"
+    checksum = 0x03 ^ 0x03 ^ 0x45 ^ 0x73 ^ 0xAF
+    assert checksum == arival_sq100.calc_checksum(payload)
+
+
 def test_create_message__return_correct_bytest_for_empty_parameter() -> None:
     message = arival_sq100.create_message(command=0x78)
     assert message == b"\x02\x00\x01\x78\x79"
@@ -81,14 +101,14 @@ def make_lap(first_index: int = 0) -> arival_sq100.Lap:
     )
 
 
-def test_is_get_tracks_finish_message__returns_true_for_0x8a_command() -> None:
-    msg = make_message(command=0x8A)
-    assert arival_sq100.is_get_tracks_finish_message(msg) is True
-
-
-def test_is_get_tracks_finish_message__returns_false_for_other_command() -> None:
-    msg = make_message(command=0x80)
-    assert arival_sq100.is_get_tracks_finish_message(msg) is False
+@pytest.mark.parametrize(
+    "command, expected", [(0x8A, True), (0x80, False), (0x81, False)]
+)
+def test_is_get_tracks_finish_message__checks_for_0x8a_command(
+    command: int, expected: bool
+) -> None:
+    msg = make_message(command=command)
+    assert arival_sq100.is_get_tracks_finish_message(msg) is expected
 
 
 def test_pack_get_tracks_parameter__returns_correct_pack() -> None:
@@ -363,6 +383,24 @@ def test_unpack_lap_info_parameter__unpacks_data_correctly() -> None:
     ]
 
 
+def test_unpack_lap_info_parameter__accepts_bytearray() -> None:
+    parameter = make_lap_info_trackhead_pack(
+        date=datetime.datetime(2010, 1, 2, 3, 4, 5),
+        no_track_points=10,
+        duration=datetime.timedelta(seconds=2345.6),
+        distance=11,
+        no_laps=0,
+        msg_type=0xAA,
+    )
+
+    track, laps = arival_sq100.unpack_lap_info_parameter(
+        cast(bytes, bytearray(parameter))
+    )
+
+    assert track.date == datetime.datetime(2010, 1, 2, 3, 4, 5)
+    assert laps == []
+
+
 def test_unpack_lap_info_parameter__raises_if_message_type_is_wrong() -> None:
     parameter = make_lap_info_trackhead_pack(
         date=datetime.datetime(2010, 1, 2, 3, 4, 5),
@@ -491,6 +529,43 @@ def test_unpack_track_info_parameter__raises_if_msg_type_is_wrong() -> None:
         arival_sq100.unpack_track_info_parameter(parameter)
 
 
+def test_unpack_track_info_parameter__raises_for_short_reply_of_other_type() -> None:
+    parameter = make_lap_info_trackhead_pack(
+        date=datetime.datetime(2010, 1, 2, 3, 4, 5),
+        no_track_points=10,
+        duration=datetime.timedelta(seconds=2345.6),
+        distance=11,
+        no_laps=0,
+        msg_type=0xAA,
+    )
+    with pytest.raises(SQ100MessageException):
+        arival_sq100.unpack_track_info_parameter(parameter)
+
+
+def test_unpack_track_info_parameter__ignores_trailing_bytes() -> None:
+    parameter = make_track_info_pack(
+        msg_type=0,
+        date=datetime.datetime(2016, 7, 23, 14, 30, 11),
+        no_track_points=1,
+        duration=datetime.timedelta(seconds=12),
+        distance=2,
+        no_laps=3,
+        memory_block_index=4,
+        track_id=5,
+        calories=6,
+        max_speed=7,
+        max_heart_rate=8,
+        avg_heart_rate=9,
+        asc_height=10,
+        des_height=11,
+        min_height=12,
+        max_height=13,
+    )
+    assert arival_sq100.unpack_track_info_parameter(
+        parameter + b"\x00"
+    ) == arival_sq100.unpack_track_info_parameter(parameter)
+
+
 def make_track_point_trackhead_pack(
     msg_type: int,
     date: datetime.datetime,
@@ -691,9 +766,7 @@ def test_unpack_track_list_parameter__unpacks_correct_data() -> None:
 def make_message_pack(
     command: int, parameter: bytes, payload_length: int, checksum: int
 ) -> bytes:
-    return struct.pack(
-        ">BH%dsB" % len(parameter), command, payload_length, parameter, checksum
-    )
+    return struct.pack(">BH", command, payload_length) + parameter + bytes([checksum])
 
 
 def test_unpack_message__unpacks_correct_data() -> None:
@@ -723,6 +796,17 @@ def test_unpack_message__raises_if_checksum_is_wrong() -> None:
         arival_sq100.unpack_message(message_pack)
 
 
+def test_unpack_message__ignores_wrong_checksum_if_verify_is_false() -> None:
+    message_pack = make_message_pack(
+        command=123,
+        parameter=b"Hello world",
+        payload_length=len("Hello world"),
+        checksum=arival_sq100.calc_checksum(b"Hello world now"),
+    )
+    message = arival_sq100.unpack_message(message_pack, verify=False)
+    assert message.parameter == b"Hello world"
+
+
 def test_unpack_message__raises_if_payload_leng_is_wrong() -> None:
     message_pack = make_message_pack(
         command=123,
@@ -767,6 +851,14 @@ def test_track_ids_to_memory_indices__returns_correct_indices() -> None:
     assert memory_indices == [30, 10, 20]
 
 
+def test_track_ids_to_memory_indices__raises_for_unknown_track_id() -> None:
+    with pytest.raises(SQ100MessageException):
+        arival_sq100.track_ids_to_memory_indices(
+            tracks=[make_track_list_entry(id=1, memory_block_index=10)],
+            track_ids=[1, 2],
+        )
+
+
 def test_query__calls_correct_write(mocker: MockerFixture) -> None:
     mock_connection = mocker.create_autospec(serial_connection.SerialConnection)
     mock_connection.read.side_effect = [
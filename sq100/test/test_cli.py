@@ -19,6 +19,7 @@
 
 import datetime
 from pathlib import Path
+from typing import List
 
 import pytest
 from pytest_mock import MockerFixture
@@ -36,43 +37,28 @@ def test_parse_args__exits_if_no_argument_give() -> None:
         cli.parse_args(args=[], default_serial_config=default_serial_config)
 
 
-def test_parse_args__list_with_no_args_returns_serial_defaults() -> None:
-    opts = cli.parse_args(args=["list"], default_serial_config=default_serial_config)
-    assert isinstance(opts, cli.ListOptions)
-    assert opts.serial_config == default_serial_config
-
-
-def test_parse_args__list_allows_configuring_serial_config() -> None:
-    opts = cli.parse_args(
-        args=[
-            "list",
-            "--comport",
-            "your_port",
-            "--baudrate",
-            "43",
-            "--timeout",
-            "2.34",
-        ],
-        default_serial_config=default_serial_config,
-    )
-    assert isinstance(opts, cli.ListOptions)
-    assert opts.serial_config.port == "your_port"
-    assert opts.serial_config.baudrate == 43
-    assert opts.serial_config.timeout == 2.34
-
-
-def test_parse_args__download_with_no_args_returns_serial_defaults() -> None:
-    opts = cli.parse_args(
-        args=["download"], default_serial_config=default_serial_config
-    )
-    assert isinstance(opts, cli.DownloadOptions)
+@pytest.mark.parametrize(
+    "command, options_type",
+    [("list", cli.ListOptions), ("download", cli.DownloadOptions)],
+)
+def test_parse_args__returns_serial_defaults_if_no_args_are_given(
+    command: str, options_type: type
+) -> None:
+    opts = cli.parse_args(args=[command], default_serial_config=default_serial_config)
+    assert isinstance(opts, options_type)
     assert opts.serial_config == default_serial_config
 
 
-def test_parse_args__download_allows_configuring_serial_config() -> None:
+@pytest.mark.parametrize(
+    "command, options_type",
+    [("list", cli.ListOptions), ("download", cli.DownloadOptions)],
+)
+def test_parse_args__allows_configuring_serial_config(
+    command: str, options_type: type
+) -> None:
     opts = cli.parse_args(
         args=[
-            "download",
+            command,
             "--comport",
             "your_port",
             "--baudrate",
@@ -82,7 +68,7 @@ def test_parse_args__download_allows_configuring_serial_config() -> None:
         ],
         default_serial_config=default_serial_config,
     )
-    assert isinstance(opts, cli.DownloadOptions)
+    assert isinstance(opts, options_type)
     assert opts.serial_config.port == "your_port"
     assert opts.serial_config.baudrate == 43
     assert opts.serial_config.timeout == 2.34
@@ -106,40 +92,43 @@ def test_parse_args__download_understands_complex_track_id_list() -> None:
     assert opts.track_id == [2, 5, 6, 7, 8, 13]
 
 
-def test_parse_args__download_sets_merge_to_false_by_default() -> None:
+def test_parse_args__download_merges_overlapping_track_id_ranges() -> None:
     opts = cli.parse_args(
-        args=["download"],
+        args=["download", "9,5-7,1-3,2-6"],
         default_serial_config=default_serial_config,
     )
     assert isinstance(opts, cli.DownloadOptions)
-    assert opts.merge is False
+    assert opts.track_id == [1, 2, 3, 4, 5, 6, 7, 9]
 
 
-def test_parse_args__download_sets_merge_to_true_if_flag_is_given() -> None:
-    opts = cli.parse_args(
-        args=["download", "--merge"],
-        default_serial_config=default_serial_config,
-    )
-    assert isinstance(opts, cli.DownloadOptions)
-    assert opts.merge is True
-
-
-def test_parse_args__download_sets_latest_to_false_by_default() -> None:
-    opts = cli.parse_args(
-        args=["download"],
-        default_serial_config=default_serial_config,
+def test_parse_args__download_returns_fresh_track_id_list() -> None:
+    first = cli.parse_args(
+        args=["download"], default_serial_config=default_serial_config
     )
-    assert isinstance(opts, cli.DownloadOptions)
-    assert opts.latest is False
-
-
-def test_parse_args__download_sets_latest_to_true_if_flag_is_given() -> None:
-    opts = cli.parse_args(
-        args=["download", "--latest"],
-        default_serial_config=default_serial_config,
+    assert isinstance(first, cli.DownloadOptions)
+    first.track_id.append(99)
+    second = cli.parse_args(
+        args=["download"], default_serial_config=default_serial_config
     )
+    assert isinstance(second, cli.DownloadOptions)
+    assert second.track_id == []
+
+
+@pytest.mark.parametrize(
+    "args, flag, expected",
+    [
+        (["download"], "merge", False),
+        (["download", "--merge"], "merge", True),
+        (["download"], "latest", False),
+        (["download", "--latest"], "latest", True),
+    ],
+)
+def test_parse_args__download_sets_flags(
+    args: List[str], flag: str, expected: bool
+) -> None:
+    opts = cli.parse_args(args=args, default_serial_config=default_serial_config)
     assert isinstance(opts, cli.DownloadOptions)
-    assert opts.latest is True
+    assert getattr(opts, flag) is expected
 
 
 def test_parse_args__exits_for_wrong_command() -> None:
@@ -187,8 +176,8 @@ def test_show_tracklist__shows_no_tracks_found_if_no_tracks_are_returned(
 def test_download_tracks__creates_gpx_files(
     tmp_path: Path, mocker: MockerFixture
 ) -> None:
-    mocked_get_tracks = mocker.patch("sq100.arival_sq100.get_tracks")
-    mocked_get_tracks.return_value = [
+    mocked_iter_tracks = mocker.patch("sq100.arival_sq100.iter_tracks")
+    mocked_iter_tracks.return_value = [
         dummies.make_track(info=dummies.make_track_info(id=1)),
         dummies.make_track(info=dummies.make_track_info(id=3)),
     ]
@@ -212,19 +201,35 @@ def test_download_tracks__adds_latest_track_id_if_flag_is_given(
 ) -> None:
     mocked_get_track_list = mocker.patch("sq100.arival_sq100.get_track_list")
     mocked_get_track_list.return_value = [test_arival_sq100.make_track_list_entry(id=8)]
-    mocked_get_tracks = mocker.patch("sq100.arival_sq100.get_tracks")
-    mocked_get_tracks.return_value = []
+    mocked_iter_tracks = mocker.patch("sq100.arival_sq100.iter_tracks")
+    mocked_iter_tracks.return_value = []
     cli.download_tracks(
         serial_config=default_serial_config,
         track_ids=[1, 3],
         latest=True,
         output_dir=tmp_path,
     )
-    mocked_get_tracks.assert_called_once_with(
+    mocked_iter_tracks.assert_called_once_with(
         config=default_serial_config, track_ids=[1, 3, 8]
     )
 
 
+def test_download_tracks__does_not_modify_given_track_ids(
+    tmp_path: Path, mocker: MockerFixture
+) -> None:
+    mocked_get_track_list = mocker.patch("sq100.arival_sq100.get_track_list")
+    mocked_get_track_list.return_value = [test_arival_sq100.make_track_list_entry(id=8)]
+    mocker.patch("sq100.arival_sq100.iter_tracks").return_value = []
+    track_ids = [1, 3]
+    cli.download_tracks(
+        serial_config=default_serial_config,
+        track_ids=track_ids,
+        latest=True,
+        output_dir=tmp_path,
+    )
+    assert track_ids == [1, 3]
+
+
 def test_download_tracks__creates_single_gpx_file_if_merge_is_true(
     tmp_path: Path, mocker: MockerFixture
 ) -> None:
@@ -261,6 +266,25 @@ def test_get_latest_track_id__returns_id_of_most_recent_date(
     assert latest_track_id == 11
 
 
+def test_get_latest_track_id__returns_last_of_tracks_with_same_date(
+    mocker: MockerFixture,
+) -> None:
+    mocked_get_track_list = mocker.patch("sq100.arival_sq100.get_track_list")
+    mocked_get_track_list.return_value = [
+        test_arival_sq100.make_track_list_entry(
+            date=datetime.datetime(2002, 2, 3, 4, 5, 6), id=10
+        ),
+        test_arival_sq100.make_track_list_entry(
+            date=datetime.datetime(2002, 2, 3, 4, 5, 6), id=11
+        ),
+        test_arival_sq100.make_track_list_entry(
+            date=datetime.datetime(2001, 12, 3, 4, 5, 6), id=12
+        ),
+    ]
+    latest_track_id = cli.get_latest_track_id(default_serial_config)
+    assert latest_track_id == 11
+
+
 def test_get_latest_track_id__returns_none_if_track_list_is_empty(
     mocker: MockerFixture,
 ) -> None:
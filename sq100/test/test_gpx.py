@@ -23,6 +23,9 @@ from typing import List, Optional
 
 from sq100 import gpx
 
+ns = "{%s}" % gpx.gpx_ns
+tpex_ns = "{%s}" % gpx.tpex_ns
+
 
 def make_gpx_root(
     metadata: Optional[gpx.Metadata] = None,
@@ -114,10 +117,9 @@ def test_create_decimal_element() -> None:
 
 
 def test_make_garmin_track_point_extension_element() -> None:
-    ns = "http://www.garmin.com/xmlschemas/TrackPointExtension/v2"
     elem = gpx.make_garmin_track_point_extension_element(heart_rate=150)
-    heart_rate_element = elem.find("{%s}hr" % ns)
-    assert elem.tag == ("{%s}TrackPointExtension" % ns)
+    heart_rate_element = elem.find(tpex_ns + "hr")
+    assert elem.tag == tpex_ns + "TrackPointExtension"
     assert heart_rate_element is not None
     assert heart_rate_element.text is not None
     assert int(heart_rate_element.text) == 150
@@ -142,7 +144,6 @@ def test_gpx_root__to_etree() -> None:
     )
     elem = gpx_root.to_etree()
 
-    ns = "{%s}" % gpx.gpx_ns
     assert elem.tag == "gpx"
     gpx_tracks = elem.findall(ns + "trk")
     assert len(gpx_tracks) == 2
@@ -163,7 +164,6 @@ def test_metadata__to_etree() -> None:
         bounds=gpx.Bounds(minlat=1.0, minlon=2.0, maxlat=3.0, maxlon=4.0),
     )
     elem = metadata.to_etree()
-    ns = "{" + gpx.gpx_ns + "}"
     name_element = elem.find(f"{ns}name")
     desc_element = elem.find(f"{ns}desc")
     time_element = elem.find(f"{ns}time")
@@ -195,7 +195,6 @@ def test_track__to_etree() -> None:
         track_points=[make_track_point(latitude=4)],
     )
     elem = track.to_etree()
-    ns = "{%s}" % gpx.gpx_ns
     cmt_element = elem.find(ns + "cmt")
     src_element = elem.find(ns + "src")
     assert cmt_element is not None
@@ -214,7 +213,6 @@ def test_track_point__to_etree() -> None:
         heart_rate=42,
     )
 
-    ns = "{%s}" % gpx.gpx_ns
     elem = track_point.to_etree()
     assert float(elem.get("lat", -1)) == 23.4
     assert float(elem.get("lon", -1)) == -32.1
@@ -229,9 +227,8 @@ def test_track_point__to_etree() -> None:
 
 def test_make_track_point_extensions_element() -> None:
     elem = gpx.make_track_point_extensions_element(heart_rate=42)
-    assert elem.tag == "{%s}%s" % (gpx.gpx_ns, "extensions")
-    garmin = "{%s}%s" % (gpx.tpex_ns, "TrackPointExtension")
-    assert elem.find(garmin) is not None
+    assert elem.tag == ns + "extensions"
+    assert elem.find(tpex_ns + "TrackPointExtension") is not None
 
 
 def test_make_track_segment_element() -> None:
@@ -240,15 +237,14 @@ def test_make_track_segment_element() -> None:
         make_track_point(latitude=2, time=datetime.datetime(2000, 1, 1, 12, 2, 2)),
     ]
     elem = gpx.make_track_segment_element(track_points=track_points)
-    assert elem.tag == "{%s}%s" % (gpx.gpx_ns, "trkseg")
-    trkpt = "{" + gpx.gpx_ns + "}trkpt"
-    time = "{" + gpx.gpx_ns + "}time"
-    assert elem.findall(trkpt)[0].get("lat") == "1"
-    time_0 = elem.findall(trkpt)[0].find(time)
+    assert elem.tag == ns + "trkseg"
+    trkpts = elem.findall(ns + "trkpt")
+    assert trkpts[0].get("lat") == "1"
+    time_0 = trkpts[0].find(ns + "time")
     assert time_0 is not None
     assert time_0.text == "2000-01-01T12:01:01Z"
-    assert elem.findall(trkpt)[1].get("lat") == "2"
-    time_1 = elem.findall(trkpt)[1].find(time)
+    assert trkpts[1].get("lat") == "2"
+    time_1 = trkpts[1].find(ns + "time")
     assert time_1 is not None
     assert time_1.text == "2000-01-01T12:02:02Z"
 
@@ -262,6 +258,17 @@ def test_indent() -> None:
     assert actual == expected
 
 
+def test_indent__indents_nested_elements() -> None:
+    elem = etree.Element("main")
+    suba = etree.SubElement(elem, "suba")
+    etree.SubElement(suba, "subsub")
+    etree.SubElement(elem, "subb")
+    gpx._indent(elem)
+    expected = "<main>\n  <suba>\n    <subsub />\n  </suba>\n  <subb />\n</main>\n"
+    actual = etree.tostring(elem, encoding="unicode")
+    assert actual == expected
+
+
 def test_stoe_tracks_to_file(tmp_path: Path) -> None:
     tracks = [make_track(), make_track()]
     filename = str(tmp_path / "tmp.gpx")
@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from unittest.mock import MagicMock
+
 import pytest
 import serial
 from pytest_mock import MockerFixture
@@ -23,57 +25,79 @@ from pytest_mock import MockerFixture
 from sq100.exceptions import SQ100SerialException
 from sq100.serial_connection import SerialConfig, SerialConnection
 
+serial_config = SerialConfig(port="port", baudrate=10, timeout=11.11)
+
+
+@pytest.fixture
+def mock_serial(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("serial.Serial")
 
-def test_enter__everything_fine_if_successful(mocker: MockerFixture) -> None:
-    mock_serial = mocker.patch("serial.Serial")
-    config = SerialConfig(port="port", baudrate=10, timeout=11.11)
-    with SerialConnection(config) as connection:
+
+def test_enter__everything_fine_if_successful(mock_serial: MagicMock) -> None:
+    with SerialConnection(serial_config) as connection:
         assert connection.connection == mock_serial.return_value
     mock_serial.assert_called_once_with(port="port", baudrate=10, timeout=11.11)
 
 
-def test_enter__raises_for_serial_exception(mocker: MockerFixture) -> None:
-    mock_serial = mocker.patch("serial.Serial")
+def test_enter__raises_for_serial_exception(mock_serial: MagicMock) -> None:
     mock_serial.side_effect = serial.SerialException
-    config = SerialConfig(port="port", baudrate=10, timeout=11.11)
     with pytest.raises(SQ100SerialException):
-        with SerialConnection(config):
+        with SerialConnection(serial_config):
             pass
 
 
-def test_exit__closes_connection(mocker: MockerFixture) -> None:
-    mock_serial = mocker.patch("serial.Serial")
+def test_exit__closes_connection(mock_serial: MagicMock) -> None:
     serial_instance = mock_serial.return_value
-    config = SerialConfig(port="port", baudrate=10, timeout=11.11)
-    with SerialConnection(config):
+    with SerialConnection(serial_config):
         pass
     serial_instance.close.assert_called_once_with()
 
 
-def test_write__forwards_call_to_serial(mocker: MockerFixture) -> None:
-    mock_serial = mocker.patch("serial.Serial")
+def test_write__forwards_call_to_serial(mock_serial: MagicMock) -> None:
     serial_instance = mock_serial.return_value
-    config = SerialConfig(port="port", baudrate=10, timeout=11.11)
-    with SerialConnection(config) as connection:
+    with SerialConnection(serial_config) as connection:
         connection.write(b"\x00\x80")
     serial_instance.write.assert_called_once_with(b"\x00\x80")
 
 
-def test_write__raises_if_forwarding_failes(mocker: MockerFixture) -> None:
-    mock_serial = mocker.patch("serial.Serial")
+def test_write__raises_if_forwarding_failes(mock_serial: MagicMock) -> None:
     serial_instance = mock_serial.return_value
     serial_instance.write.side_effect = serial.SerialTimeoutException
-    config = SerialConfig(port="port", baudrate=10, timeout=11.11)
-    with SerialConnection(config) as connection:
+    with SerialConnection(serial_config) as connection:
         with pytest.raises(SQ100SerialException):
             connection.write(b"\x00\x80")
     serial_instance.write.assert_called_once_with(b"\x00\x80")
 
 
-def test_read__forwards_data_from_serial(mocker: MockerFixture) -> None:
-    mock_serial = mocker.patch("serial.Serial")
+def test_read__forwards_data_from_serial(mock_serial: MagicMock) -> None:
     serial_instance = mock_serial.return_value
+    serial_instance.in_waiting = 0
     serial_instance.read.return_value = b"\xaa\xbb\xcc"
-    config = SerialConfig(port="port", baudrate=10, timeout=11.11)
-    with SerialConnection(config) as connection:
+    with SerialConnection(serial_config) as connection:
         assert connection.read(1234) == b"\xaa\xbb\xcc"
+
+
+def test_read__keeps_surplus_of_waiting_data_for_next_read(
+    mock_serial: MagicMock,
+) -> None:
+    serial_instance = mock_serial.return_value
+    serial_instance.in_waiting = 5
+    serial_instance.read.return_value = b"\xaa\xbb\xcc\xdd\xee"
+    with SerialConnection(serial_config) as connection:
+        assert connection.read(3) == b"\xaa\xbb\xcc"
+        serial_instance.in_waiting = 0
+        assert connection.read(2) == b"\xdd\xee"
+    serial_instance.read.assert_called_once_with(5)
+
+
+def test_read__drops_surplus_of_previous_session(mock_serial: MagicMock) -> None:
+    serial_instance = mock_serial.return_value
+    serial_instance.in_waiting = 5
+    serial_instance.read.return_value = b"\xaa\xbb\xcc\xdd\xee"
+    connection = SerialConnection(serial_config)
+    with connection:
+        assert connection.read(3) == b"\xaa\xbb\xcc"
+    serial_instance.in_waiting = 0
+    serial_instance.read.return_value = b"\x11\x22"
+    with connection:
+        assert connection.read(2) == b"\x11\x22"